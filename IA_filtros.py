@@ -1,13 +1,26 @@
-import pandas as pd
+import numpy as np
+import csv
 import re
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import PyPDF2
+import sys
+import hashlib
+import tempfile
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.preprocessing import normalize
+import pymupdf
 
 CARPETA_CVS = "hojas_de_vida"
+CARPETA_CACHE = ".cache"
+TOP_RANKING = 10
 
-STOP_WORDS = set([
+# Resultado de analizar_candidatos, ordenado de mayor a menor score:
+# candidatos es una lista de tuplas (nombre, archivo, score) y scores el ndarray de scores
+Ranking = namedtuple('Ranking', ['candidatos', 'scores'])
+
+STOP_WORDS = frozenset([
     'el', 'la', 'de', 'en', 'y', 'a', 'los', 'del', 'se', 'las',
     'por', 'un', 'para', 'con', 'no', 'una', 'su', 'al', 'es', 'lo',
     'como', 'más', 'o', 'pero', 'sus', 'le', 'ya', 'fue', 'este',
@@ -16,33 +29,97 @@ STOP_WORDS = set([
     'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra', 'otros'
 ])
 
+_NOMBRE_RE = re.compile(r'nombre\s*(?:completo)?:\s*([a-záéíóúñ\s]+?)(?:\n|código|correo|teléfono|email)')
+_ESPACIOS = re.compile(r'\s+')
+_CV_PREFIX = re.compile(r'^(cv|hoja|vida)_?', re.I)
+
+# Palabras de 3 o más letras (con tildes y ñ); cualquier otro carácter las separa
+_TOKEN_PATTERN = r'(?<![a-záéíóúñ])[a-záéíóúñ]{3,}(?![a-záéíóúñ])'
+_STOP_RE = re.compile(
+    r'(?<![a-záéíóúñ])(?:'
+    + '|'.join(sorted(STOP_WORDS, key=len, reverse=True))
+    + r')(?![a-záéíóúñ])'
+)
+
+def leer_cache(ruta_cache):
+    # Una entrada ilegible (p. ej. no es UTF-8) cuenta como fallo de caché y se borra
+    try:
+        with open(ruta_cache, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        try:
+            os.remove(ruta_cache)
+        except OSError:
+            pass
+        return None
+
+def guardar_cache(ruta_cache, texto):
+    # Un temporal propio por proceso y os.replace: nunca queda un .txt a medias
+    tmp = None
+    try:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=CARPETA_CACHE,
+                                         suffix='.tmp', delete=False) as f:
+            tmp = f.name
+            f.write(texto)
+        os.replace(tmp, ruta_cache)
+    except (OSError, ValueError):
+        # Sin caché (solo lectura, disco lleno, texto no codificable...) el texto
+        # extraído sigue siendo válido
+        if tmp and os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
 def extraer_texto_pdf(ruta):
     try:
-        with open(ruta, 'rb') as f:
-            lector = PyPDF2.PdfReader(f)
-            texto = ''.join(pagina.extract_text() for pagina in lector.pages)
+        st = os.stat(ruta)
+        clave = hashlib.sha1(f"{ruta}|{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()
+        ruta_cache = os.path.join(CARPETA_CACHE, f"{clave}.txt")
+        
+        texto = leer_cache(ruta_cache)
+        if texto is None:
+            with pymupdf.open(ruta) as doc:
+                texto = ''.join(pagina.get_text("text") for pagina in doc)
+            guardar_cache(ruta_cache, texto)
+        
         return texto if len(texto.strip()) > 50 else None
     except Exception as e:
-        print(f"   [!] Error en {os.path.basename(ruta)}: {e}")
-        return None
+        raise RuntimeError(f"Error en {os.path.basename(ruta)}: {e}") from e
 
 def extraer_nombre(texto, archivo):
-    match = re.search(r'nombre\s*(?:completo)?:\s*([a-záéíóúñ\s]+?)(?:\n|código|correo|teléfono|email)', texto.lower())
+    match = _NOMBRE_RE.search(texto.lower())
     if match:
         nombre = match.group(1).strip().title()
-        nombre = re.sub(r'\s+', ' ', nombre)
+        nombre = _ESPACIOS.sub(' ', nombre)
         return nombre
     
     nombre = os.path.splitext(os.path.basename(archivo))[0]
-    nombre = re.sub(r'^(cv|hoja|vida)_?', '', nombre, flags=re.I)
+    nombre = _CV_PREFIX.sub('', nombre)
     nombre = nombre.replace('_', ' ').title()
     return nombre
 
-def limpiar_texto(texto):
-    texto = texto.lower()
-    texto = re.sub(r'[^a-záéíóúñ\s]', ' ', texto)
-    palabras = [p for p in texto.split() if len(p) > 2 and p not in STOP_WORDS]
-    return ' '.join(palabras)
+def preprocesar_texto(texto):
+    # Quita las stop words en C con una sola alternancia, antes de tokenizar
+    return _STOP_RE.sub(' ', texto.lower())
+
+def procesar_pdf(ruta):
+    # Devuelve (candidato, error); el error se registra en el proceso principal
+    try:
+        texto = extraer_texto_pdf(ruta)
+    except Exception as e:
+        return None, str(e)
+    if not texto:
+        return None, None
+    archivo = os.path.basename(ruta)
+    return {
+        'Nombre': extraer_nombre(texto, archivo),
+        'Archivo': archivo,
+        'Texto': texto
+    }, None
 
 def analizar_candidatos(perfil_ideal, carpeta=CARPETA_CVS):
     print("=" * 85)
@@ -55,7 +132,9 @@ def analizar_candidatos(perfil_ideal, carpeta=CARPETA_CVS):
         print(f"[*] Carpeta '{carpeta}' creada. Coloca los PDFs ahí.\n")
         return None
     
-    pdfs = [f for f in os.listdir(carpeta) if f.endswith('.pdf')]
+    with os.scandir(carpeta) as it:
+        entradas = [e for e in it if e.is_file() and e.name.lower().endswith('.pdf')]
+    pdfs = [e.name for e in entradas]
     
     if not pdfs:
         print(f"[X] No hay archivos PDF en '{carpeta}'\n")
@@ -65,44 +144,96 @@ def analizar_candidatos(perfil_ideal, carpeta=CARPETA_CVS):
     print(f"[*] PDFs encontrados: {len(pdfs)}\n")
     
     print("[*] Leyendo archivos...")
-    candidatos = []
+    rutas = [e.path for e in entradas]
+    nombres, archivos, indices = [], [], []
+    pendientes = {}
     
-    for i, pdf in enumerate(pdfs, 1):
-        ruta = os.path.join(carpeta, pdf)
-        print(f"   {i}. {pdf}...", end=" ")
-        
-        texto = extraer_texto_pdf(ruta)
-        
-        if texto:
-            candidatos.append({
-                'Nombre': extraer_nombre(texto, pdf),
-                'Archivo': pdf,
-                'Texto': limpiar_texto(texto)
-            })
-            print("[OK]")
-        else:
-            print("[ERROR]")
-    
-    if not candidatos:
+    def volcar_log(siguiente):
+        # Escribe de una vez el tramo contiguo de archivos ya terminados, en orden de carpeta
+        lote = []
+        while siguiente in pendientes:
+            lote.extend(pendientes.pop(siguiente))
+            siguiente += 1
+        if lote:
+            sys.stdout.write(''.join(lote))
+            sys.stdout.flush()
+        return siguiente
+    
+    def iter_textos(futuros):
+        # Entrega cada texto al vectorizador en cuanto termina su PDF, sin guardarlo;
+        # solo quedan nombre, archivo y su posición en la carpeta (para desempates)
+        siguiente = 1
+        for fut in as_completed(futuros):
+            i, pdf = futuros[fut]
+            try:
+                candidato, error = fut.result()
+            except Exception as e:
+                candidato, error = None, f"Error en {pdf}: {e}"
+            if candidato:
+                nombres.append(candidato['Nombre'])
+                archivos.append(candidato['Archivo'])
+                indices.append(i)
+                pendientes[i] = [f"   {i}. {pdf}... [OK]\n"]
+            else:
+                pendientes[i] = [f"   {i}. {pdf}... [ERROR]\n"]
+                if error:
+                    pendientes[i].append(f"      [!] {error}\n")
+            siguiente = volcar_log(siguiente)
+            if candidato:
+                yield candidato['Texto']
+    
+    # Espacio de hashing proporcional al corpus: ~500 n-gramas por CV, entre 2**14 y 2**20
+    n_features = 2 ** min(20, max(14, (len(pdfs) * 500).bit_length()))
+    hv = HashingVectorizer(
+        n_features=n_features,
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm=None,
+        preprocessor=preprocesar_texto,
+        token_pattern=_TOKEN_PATTERN,
+        strip_accents=None
+    )
+    
+    workers = min(len(rutas), os.cpu_count() or 1)
+    if sys.platform == 'win32':
+        # ProcessPoolExecutor no acepta más de 61 procesos en Windows
+        workers = min(workers, 61)
+    
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futuros = {
+            ex.submit(procesar_pdf, ruta): (i, pdf)
+            for i, (ruta, pdf) in enumerate(zip(rutas, pdfs), 1)
+        }
+        X = hv.transform(itertools.chain(iter_textos(futuros), [perfil_ideal]))
+    if pendientes:
+        sys.stdout.write(''.join(l for i in sorted(pendientes) for l in pendientes[i]))
+    
+    if not nombres:
         print("\n[X] No se pudo procesar ningún PDF\n")
         return None
     
-    print(f"\n[OK] {len(candidatos)} CVs procesados correctamente\n")
-    
-    df = pd.DataFrame(candidatos)
+    print(f"\n[OK] {len(nombres)} CVs procesados correctamente\n")
     
     print("[*] Analizando con IA (TF-IDF + Similitud de Coseno)...")
     
-    perfil_limpio = limpiar_texto(perfil_ideal)
-    textos = df['Texto'].tolist() + [perfil_limpio]
-    
-    vectorizer = TfidfVectorizer(max_features=100, ngram_range=(1, 2))
-    matriz_tfidf = vectorizer.fit_transform(textos)
+    # Con 10 o más CVs se descartan los n-gramas que aparecen en un solo documento (min_df=2),
+    # salvo que no quede ninguno
+    if len(nombres) >= 10:
+        columnas = np.flatnonzero(np.bincount(X.indices, minlength=X.shape[1]) >= 2)
+        if len(columnas):
+            X = X[:, columnas]
+    matriz_tfidf = TfidfTransformer(sublinear_tf=True).fit_transform(X)
     
-    similitudes = cosine_similarity(matriz_tfidf[-1], matriz_tfidf[:-1]).flatten()
-    df['Score'] = similitudes
+    # Con filas de norma L2 el coseno es un producto punto: una sola SpMV
+    M = normalize(matriz_tfidf, norm='l2', copy=False)
+    q = M[-1].toarray().ravel()
+    similitudes = M[:-1] @ q
     
-    df = df.sort_values('Score', ascending=False).reset_index(drop=True)
+    # Un solo ordenamiento alimenta la consola (los K mejores) y el CSV.
+    # Los empates se resuelven por el orden de la carpeta, no por cuál PDF terminó antes
+    orden = np.lexsort((indices, -similitudes))
+    k = min(TOP_RANKING, len(similitudes))
+    top_idx = orden[:k]
     
     print(f"[OK] Análisis completado\n")
     
@@ -111,23 +242,43 @@ def analizar_candidatos(perfil_ideal, carpeta=CARPETA_CVS):
     print("=" * 85)
     print()
     
-    for i, row in df.iterrows():
+    top_scores = similitudes[top_idx]
+    barras = ["█" * n for n in (top_scores * 50).astype(np.int32).tolist()]
+    porcentajes = (top_scores * 100).astype(np.int32).tolist()
+    
+    lineas = []
+    for i, idx in enumerate(top_idx):
         prefijo = ["[1]", "[2]", "[3]"][i] if i < 3 else f"[{i+1}]"
-        barra = "█" * int(row['Score'] * 50)
         
-        print(f"{prefijo} {row['Nombre']}")
-        print(f"      Score: {row['Score']:.4f} ({int(row['Score']*100)}%) [{barra}]")
-        print(f"      Archivo: {row['Archivo']}\n")
+        lineas.append(
+            f"{prefijo} {nombres[idx]}\n"
+            f"      Score: {top_scores[i]:.4f} ({porcentajes[i]}%) [{barras[i]}]\n"
+            f"      Archivo: {archivos[idx]}\n\n"
+        )
+    sys.stdout.write(''.join(lineas))
+    
+    if len(similitudes) > k:
+        print(f"   ... y {len(similitudes) - k} candidatos más en ranking_monitores.csv\n")
     
+    mejor = top_idx[0]
     print("=" * 85)
-    print(f" RECOMENDADO: {df.iloc[0]['Nombre']} (Score: {df.iloc[0]['Score']:.4f}) ".center(85))
+    print(f" RECOMENDADO: {nombres[mejor]} (Score: {similitudes[mejor]:.4f}) ".center(85))
     print("=" * 85)
     print()
     
-    df[['Nombre', 'Archivo', 'Score']].to_csv('ranking_monitores.csv', index=False)
+    scores = similitudes[orden]
+    ranking = Ranking(
+        candidatos=[(nombres[i], archivos[i], float(s)) for i, s in zip(orden, scores)],
+        scores=scores
+    )
+    
+    with open('ranking_monitores.csv', 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(['Nombre', 'Archivo', 'Score'])
+        w.writerows((nombre, archivo, f"{s:.6f}") for nombre, archivo, s in ranking.candidatos)
     print("[*] Resultados guardados en: ranking_monitores.csv\n")
     
-    return df
+    return ranking
 
 if __name__ == "__main__":
     
@@ -160,10 +311,10 @@ if __name__ == "__main__":
     if ranking is not None:
         print("[*] ESTADÍSTICAS")
         print("-" * 85)
-        print(f"   • Total candidatos: {len(ranking)}")
-        print(f"   • Score promedio: {ranking['Score'].mean():.4f}")
-        print(f"   • Score máximo: {ranking['Score'].max():.4f}")
-        print(f"   • Score mínimo: {ranking['Score'].min():.4f}")
+        print(f"   • Total candidatos: {len(ranking.candidatos)}")
+        print(f"   • Score promedio: {ranking.scores.mean():.4f}")
+        print(f"   • Score máximo: {ranking.scores.max():.4f}")
+        print(f"   • Score mínimo: {ranking.scores.min():.4f}")
         print("-" * 85)
         print()
         
@@ -171,7 +322,7 @@ if __name__ == "__main__":
     
     print("=" * 85)
     print()
-    print("[*] INSTALACIÓN: pip install pandas scikit-learn PyPDF2")
+    print("[*] INSTALACIÓN: pip install numpy scikit-learn pymupdf")
     print("[*] USO: Coloca los PDFs en la carpeta 'hojas_de_vida/' y ejecuta")
     print()
     print("=" * 85)
\ No newline at end of file